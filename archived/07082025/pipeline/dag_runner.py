@@ -0,0 +1,285 @@
+"""
+In-process DAG runner for the chunking pipeline
+
+Stages are declared with their inputs (names of upstream stages) and the
+type of their output. The runner executes independent stages in parallel,
+fans a stage out over the items of a list input, caches each stage output
+on disk keyed by a hash of its inputs and streams progress as it goes.
+
+Calls of stages declared with executor="process" run in worker processes,
+for CPU-bound work that would otherwise be serialized by the GIL. Stages
+waiting on I/O (LM Studio) keep the default thread executor.
+"""
+
+import json
+import time
+import hashlib
+import threading
+import multiprocessing
+from pathlib import Path
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from metrics import METRICS
+from file_utils import atomic_write
+
+EXECUTORS = ("thread", "process")
+
+def call_in_process(func: Callable[..., Any], inputs: Dict[str, Any], stage_name: str,
+                    profile_name: str, profile_dir: Optional[Path]):
+    """
+    Run one stage call in a worker process
+
+    Returns:
+        tuple: (output, metrics recorded by the call), the parent merges the metrics into its registry
+    """
+    # Pool workers are reused, only send back what this call recorded
+    METRICS.reset()
+    METRICS.profile_dir = profile_dir
+
+    with METRICS.profile(profile_name), METRICS.timer("stage_call_seconds", stage=stage_name):
+        output = func(**inputs)
+
+    return output, METRICS.state()
+
+class Stage:
+    def __init__(self, name: str, func: Callable[..., Any], inputs: Sequence[str] = (),
+                 output_type: type = object, fan_out: Optional[str] = None,
+                 cache: bool = True, version: str = "1",
+                 output_files: Optional[Callable[[Any], List[str]]] = None,
+                 executor: str = "thread", key_extras: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            name (str): Unique stage name, also the key of its output
+            func (callable): Called with the outputs of `inputs` as keyword arguments
+            inputs (list): Names of the stages this stage depends on
+            output_type (type): Expected type of the output (of each item when fanned out)
+            fan_out (str): Name of a list input; func is called once per item, in parallel
+            cache (bool): Cache the output on disk keyed by a hash of the inputs
+            version (str): Bump to invalidate cached outputs after changing the code of func
+            output_files (callable): Maps an output (one item when fanned out) to the files
+                the stage wrote; a cached output whose files are gone is treated as a miss
+            executor (str): "thread", or "process" for CPU-bound calls; func and its
+                inputs and output must then be picklable
+            key_extras (callable): Returns the settings (config, prompt) the output depends on
+                besides its inputs, added to the cache key
+        """
+        if fan_out is not None and fan_out not in inputs:
+            raise ValueError(f"Stage '{name}' fans out over '{fan_out}' which is not one of its inputs")
+        if executor not in EXECUTORS:
+            raise ValueError(f"Stage '{name}' has unknown executor '{executor}', expected one of {EXECUTORS}")
+
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.output_type = output_type
+        self.fan_out = fan_out
+        self.cache = cache
+        self.version = version
+        self.output_files = output_files
+        self.executor = executor
+        self.key_extras = key_extras
+
+class PipelineRunner:
+    def __init__(self, stages: List[Stage], cache_dir: Optional[str] = None,
+                 max_workers: int = 4, progress: Callable[[str], None] = print,
+                 process_initializer: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            stages (list): Stages of the pipeline, in any order
+            cache_dir (str): Directory for cached stage outputs (None disables caching)
+            max_workers (int): Maximum number of stages, and of fan-out items, running at once
+            progress (callable): Receives one progress line per event
+            process_initializer (callable): Run once in each worker process, e.g. to configure logging
+        """
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            self.stages[stage.name] = stage
+
+        for stage in stages:
+            for input_name in stage.inputs:
+                if input_name not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{input_name}'")
+
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_workers = max_workers
+        self.progress = progress
+        self.process_initializer = process_initializer
+        self._progress_lock = threading.Lock()
+
+    def report(self, message: str):
+        """Emit one progress line, stages running in parallel never interleave"""
+        with self._progress_lock:
+            self.progress(message)
+
+    def resolve(self, targets: Optional[Sequence[str]] = None) -> List[str]:
+        """Return the stages needed for `targets` (all stages if None) in topological order"""
+        order = []
+        state = {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Cycle in pipeline: {' -> '.join(path + [name])}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+
+            state[name] = "visiting"
+            for input_name in self.stages[name].inputs:
+                visit(input_name, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in (targets or list(self.stages)):
+            visit(name, [])
+
+        return order
+
+    def cache_key(self, stage: Stage, inputs: Dict[str, Any]) -> str:
+        """Hash of the stage identity, its settings and its input values"""
+        extras = stage.key_extras() if stage.key_extras else None
+        payload = json.dumps({"stage": stage.name, "version": stage.version, "extras": extras, "inputs": inputs},
+                             sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def load_cached(self, stage: Stage, key: str):
+        """Return (True, output) on a cache hit, (False, None) otherwise"""
+        if not (self.cache_dir and stage.cache):
+            return False, None
+
+        cache_file = self.cache_dir / stage.name / f"{key}.json"
+        if not cache_file.exists():
+            return False, None
+
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            output = json.load(f)
+
+        # The files the stage wrote are its real output, without them the entry is stale
+        if stage.output_files and not all(Path(p).exists() for p in stage.output_files(output)):
+            return False, None
+
+        return True, output
+
+    def save_cached(self, stage: Stage, key: str, output: Any):
+        """Store a stage output, written to a temp file first so readers never see partial JSON"""
+        if not (self.cache_dir and stage.cache):
+            return
+
+        cache_file = self.cache_dir / stage.name / f"{key}.json"
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+
+        with atomic_write(str(cache_file)) as f:
+            json.dump(output, f, ensure_ascii=False)
+
+    def call(self, stage: Stage, inputs: Dict[str, Any], process_pool: Optional[ProcessPoolExecutor] = None):
+        """Run one invocation of a stage through the cache, returns (output, cache_hit)"""
+        key = self.cache_key(stage, inputs)
+        hit, output = self.load_cached(stage, key)
+        if hit:
+            METRICS.inc("stage_cache_hits_total", stage=stage.name)
+            return output, True
+
+        if self.cache_dir and stage.cache:
+            METRICS.inc("stage_cache_misses_total", stage=stage.name)
+
+        profile_name = f"{stage.name}-{key[:12]}"
+        if stage.executor == "process":
+            # The cache stays in this process, only the work itself is sent to the worker
+            output, recorded = process_pool.submit(call_in_process, stage.func, inputs, stage.name,
+                                                   profile_name, METRICS.profile_dir).result()
+            METRICS.merge(recorded)
+        else:
+            with METRICS.profile(profile_name), METRICS.timer("stage_call_seconds", stage=stage.name):
+                output = stage.func(**inputs)
+        if not isinstance(output, stage.output_type):
+            raise TypeError(f"Stage '{stage.name}' returned {type(output).__name__}, "
+                            f"expected {stage.output_type.__name__}")
+
+        self.save_cached(stage, key, output)
+        return output, False
+
+    def run_stage(self, stage: Stage, inputs: Dict[str, Any], item_pool: ThreadPoolExecutor,
+                  process_pool: Optional[ProcessPoolExecutor] = None):
+        """Run a stage and report its duration, timed from when it starts rather than when it was queued"""
+        self.report(f"🚀 [{stage.name}] started")
+        start = time.perf_counter()
+
+        output = self.compute_stage(stage, inputs, item_pool, process_pool)
+
+        elapsed = time.perf_counter() - start
+        METRICS.observe("stage_seconds", elapsed, stage=stage.name)
+        self.report(f"✅ [{stage.name}] completed in {elapsed:.1f}s")
+        return output
+
+    def compute_stage(self, stage: Stage, inputs: Dict[str, Any], item_pool: ThreadPoolExecutor,
+                      process_pool: Optional[ProcessPoolExecutor] = None):
+        """Compute the output of a stage, fanning out over its list input when declared"""
+        if stage.fan_out is None:
+            output, hit = self.call(stage, inputs, process_pool)
+            if hit:
+                self.report(f"♻️  [{stage.name}] cache hit")
+            return output
+
+        items = inputs[stage.fan_out]
+        if not isinstance(items, list):
+            raise TypeError(f"Stage '{stage.name}' fans out over '{stage.fan_out}' which is not a list")
+
+        # Item threads wait on the worker processes for stages using the process executor
+        futures = [item_pool.submit(self.call, stage, {**inputs, stage.fan_out: item}, process_pool)
+                   for item in items]
+
+        outputs = []
+        for index, future in enumerate(futures, 1):
+            output, hit = future.result()
+            outputs.append(output)
+            self.report(f"   [{stage.name}] {index}/{len(items)}{' (cache hit)' if hit else ''}")
+
+        return outputs
+
+    def run(self, targets: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Run the stages needed for `targets`
+
+        Returns:
+            dict: Output of every stage that ran, keyed by stage name
+        """
+        order = self.resolve(targets)
+        outputs = {}
+        pending = list(order)
+        running = {}
+
+        # Spawned rather than forked: forking a process that runs threads can copy held locks
+        needs_processes = any(self.stages[name].executor == "process" for name in order)
+        process_pool_context = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                   mp_context=multiprocessing.get_context("spawn"),
+                                                   initializer=self.process_initializer) \
+            if needs_processes else nullcontext()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage") as stage_pool, \
+             ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="item") as item_pool, \
+             process_pool_context as process_pool:
+            while pending or running:
+                # Start every stage whose inputs are all available
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if all(input_name in outputs for input_name in stage.inputs):
+                        pending.remove(name)
+                        inputs = {input_name: outputs[input_name] for input_name in stage.inputs}
+                        running[stage_pool.submit(self.run_stage, stage, inputs, item_pool, process_pool)] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        outputs[name] = future.result()
+                    except Exception as e:
+                        self.report(f"❌ [{name}] failed: {e}")
+                        # Let stages already running finish, start nothing new
+                        wait(running)
+                        raise RuntimeError(f"Pipeline failed at stage '{name}'") from e
+
+        return outputs
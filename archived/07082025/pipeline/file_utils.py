@@ -0,0 +1,51 @@
+"""
+File helpers shared by the pipeline stages
+"""
+
+import os
+import stat
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+# Read once at import: os.umask can only be read by setting it, which is not thread-safe
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def file_sha256(path):
+    """Hash file content so cached results follow the file, not its mtime"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+@contextmanager
+def atomic_write(output_file, mode='w', encoding='utf-8'):
+    """
+    Open a temp file next to `output_file` and move it into place on success
+
+    Readers see either the previous complete file or the new complete file,
+    never a partially written one. On error the previous file is left untouched.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, prefix=f".{os.path.basename(output_file)}.", suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else encoding) as f:
+            # mkstemp creates the file as 0600, keep the mode of the file being replaced
+            # or use the mode open() would have given a new file
+            if os.path.exists(output_file):
+                file_mode = stat.S_IMODE(os.stat(output_file).st_mode)
+            else:
+                file_mode = 0o666 & ~_UMASK
+            os.chmod(tmp_path, file_mode)
+
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
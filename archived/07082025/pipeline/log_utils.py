@@ -0,0 +1,22 @@
+"""
+Logging helpers shared by the pipeline stages
+"""
+
+import logging
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+def setup_logging(logger, log_file, level=logging.INFO, log_format=LOG_FORMAT):
+    """
+    Log to the console and send `logger` to its own log file
+
+    Called by the entry point rather than at import, so a process running
+    several phases configures logging once and decides the level. The
+    console handler goes on the root logger and is only added by the first
+    call; each phase logger gets one file handler.
+    """
+    logging.basicConfig(level=level, format=log_format)
+    if not any(isinstance(handler, logging.FileHandler) for handler in logger.handlers):
+        file_handler = logging.FileHandler(log_file, encoding='utf-8', delay=True)
+        file_handler.setFormatter(logging.Formatter(log_format))
+        logger.addHandler(file_handler)
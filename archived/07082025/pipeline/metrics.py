@@ -0,0 +1,195 @@
+"""
+Metrics for the chunking pipeline
+
+Counters, histograms and timers collected in process and exported as a
+Prometheus text file or a JSON snapshot. Rates such as pages/sec are
+derived by the consumer from a counter and its matching `_seconds`
+histogram, the same way Prometheus does it.
+"""
+
+import json
+import time
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from file_utils import atomic_write
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float("inf"))
+
+def format_key(name: str, labels: Dict[str, str]) -> str:
+    """Metric name with Prometheus style labels, e.g. stage_seconds{stage="rough_chunks"}"""
+    if not labels:
+        return name
+    label_text = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    return f"{name}{{{label_text}}}"
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def merge(self, other: "Histogram"):
+        """Add the observations of another histogram with the same buckets"""
+        self.bucket_counts = [a + b for a, b in zip(self.bucket_counts, other.bucket_counts)]
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "min": self.min,
+            "max": self.max
+        }
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self._histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self.started_at = time.time()
+        # Directory for per-stage cProfile dumps, None disables profiling
+        self.profile_dir: Optional[Path] = None
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increase a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation in a histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        """Drop every recorded value"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def state(self) -> Dict[str, Dict]:
+        """Raw recorded values, picklable so a worker process can send them to the parent"""
+        with self._lock:
+            return {"counters": dict(self._counters), "histograms": dict(self._histograms)}
+
+    def merge(self, state: Dict[str, Dict]):
+        """Add values recorded elsewhere (see state) to this registry"""
+        with self._lock:
+            for key, value in state["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, histogram in state["histograms"].items():
+                if key in self._histograms:
+                    self._histograms[key].merge(histogram)
+                else:
+                    self._histograms[key] = histogram
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time a block into the histogram `name` (in seconds)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def profile(self, stage_name: str):
+        """
+        Profile a block with cProfile when profile_dir is set, the dump
+        (<profile_dir>/<stage_name>.prof) opens with pstats or snakeviz.
+        For sampling with py-spy, attach to the process instead: worker
+        threads are named after the pipeline stage pools.
+        """
+        if self.profile_dir is None:
+            yield
+            return
+
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(self.profile_dir / f"{stage_name}.prof"))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Current values as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                "uptime_seconds": time.time() - self.started_at,
+                "counters": {format_key(name, dict(labels)): value
+                             for (name, labels), value in sorted(self._counters.items())},
+                "histograms": {format_key(name, dict(labels)): histogram.to_dict()
+                               for (name, labels), histogram in sorted(self._histograms.items())}
+            }
+
+    def to_prometheus(self) -> str:
+        """Current values in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            # Items are sorted by name, so each family's series follow its one TYPE line
+            family = None
+            for (name, labels), value in sorted(self._counters.items()):
+                if name != family:
+                    family = name
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{format_key(name, dict(labels))} {value}")
+
+            family = None
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name != family:
+                    family = name
+                    lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else str(bound)
+                    lines.append(f"{format_key(name + '_bucket', {**dict(labels), 'le': le})} {cumulative}")
+                lines.append(f"{format_key(name + '_sum', dict(labels))} {histogram.sum}")
+                lines.append(f"{format_key(name + '_count', dict(labels))} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def save_json(self, output_file: str):
+        """Write a JSON snapshot"""
+        with atomic_write(output_file) as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def save_prometheus(self, output_file: str):
+        """Write a Prometheus text file (node_exporter textfile collector format)"""
+        # The textfile collector may read at any time, never expose a partial file
+        with atomic_write(output_file) as f:
+            f.write(self.to_prometheus())
+
+# Process-wide registry shared by all pipeline stages
+METRICS = MetricsRegistry()
@@ -1,17 +1,18 @@
 import os
-from pypdf import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import sys
 import logging
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('chunking.log'),
-        logging.StreamHandler()
-    ]
-)
+# Add pipeline directory to path to import the shared modules (metrics, file_utils, log_utils, text_utils)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import METRICS
+from file_utils import atomic_write
+from log_utils import setup_logging
+from text_utils import normalize_vietnamese_text
+
+logger = logging.getLogger(__name__)
+
+LOG_FILE = 'chunking.log'
 
 def read_files_to_array(folder_path):
     """Read file list from folder and append to array"""
@@ -30,21 +31,25 @@ def extract_text_from_pdf(pdf_path):
         import pdfplumber
         
         text = ""
-        with pdfplumber.open(pdf_path) as pdf:
+        with METRICS.timer("phase1_extract_seconds"), pdfplumber.open(pdf_path) as pdf:
             for page in pdf.pages:
                 page_text = page.extract_text()
+                METRICS.inc("phase1_pages_total")
                 if page_text:
                     text += page_text + "\n"
         
         return text
     except Exception as e:
-        logging.error(f"Error reading PDF {pdf_path}: {str(e)}")
+        logger.error(f"Error reading PDF {pdf_path}: {str(e)}")
         return ""
 
 def clean_pdf_text(text):
     """Clean text from PDF, remove noise"""
     import re
     
+    # Normalize Unicode forms and glyph variants
+    text = normalize_vietnamese_text(text)
+    
     # Remove "Page X of Y" lines
     text = re.sub(r'Page \d+of \d+\n?', '', text)
     
@@ -77,7 +82,7 @@ def chunk_by_stories(text):
     opening_matches = list(re.finditer(opening_pattern, text, flags=re.MULTILINE))
     # Prioritize cutting by title; only fallback to 'Thus I have heard:' when no titles
     split_matches = title_matches if title_matches else opening_matches
-    logging.info(
+    logger.info(
         f"Titles found: {len(title_matches)} | Openings found: {len(opening_matches)} | Used for splitting: {len(split_matches)}"
     )
     if not split_matches:
@@ -89,59 +94,63 @@ def chunk_by_stories(text):
         story = text[start_pos:end_pos].strip()
         if story:
             stories.append(story)
-            logging.info(f"Story {len(stories)}: {len(story)} characters")
+            logger.debug(f"Story {len(stories)}: {len(story)} characters")
     return stories
 
-def process_pdf_file(pdf_path, output_file='chunks_output.txt'):
+def process_pdf_file(pdf_path, output_file='chunks_output.txt', log_content=False):
     """
     Process a specific PDF file and create chunks
     
     Args:
         pdf_path (str): Path to the PDF file to process
         output_file (str): Output file name for chunks (default: 'chunks_output.txt')
+        log_content (bool): Also log the full content of every chunk (debug only, default: False)
     
     Returns:
         list: List of text chunks
     """
-    logging.info(f"Processing PDF file: {pdf_path}")
+    logger.info(f"Processing PDF file: {pdf_path}")
     
     # Check if file exists
     if not os.path.exists(pdf_path):
-        logging.error(f"File not found: {pdf_path}")
+        logger.error(f"File not found: {pdf_path}")
         return []
     
     # Extract text from PDF
-    logging.info("Extracting text from PDF...")
+    logger.info("Extracting text from PDF...")
     text = extract_text_from_pdf(pdf_path)
     
     if not text.strip():
-        logging.error("Could not extract text from PDF")
+        logger.error("Could not extract text from PDF")
         return []
     
-    logging.info(f"Extracted {len(text)} characters from PDF")
+    logger.info(f"Extracted {len(text)} characters from PDF")
     
     # Clean text, remove noise
-    logging.info("Cleaning text, removing noise...")
+    logger.info("Cleaning text, removing noise...")
     cleaned_text = clean_pdf_text(text)
-    logging.info(f"After cleaning: {len(cleaned_text)} characters")
+    logger.info(f"After cleaning: {len(cleaned_text)} characters")
     
     # Use story-based chunking
-    logging.info("Performing story-based chunking...")
-    chunks = chunk_by_stories(cleaned_text)
+    logger.info("Performing story-based chunking...")
+    with METRICS.timer("phase1_segment_seconds"):
+        chunks = chunk_by_stories(cleaned_text)
+    METRICS.inc("phase1_stories_total", len(chunks))
     
-    logging.info(f"Created {len(chunks)} chunks")
+    logger.info(f"Created {len(chunks)} chunks")
     
-    # Log each chunk
-    for i, chunk in enumerate(chunks, 1):
-        logging.info(f"\n{'='*50}")
-        logging.info(f"CHUNK {i}/{len(chunks)}")
-        logging.info(f"Length: {len(chunk)} characters")
-        logging.info(f"{'='*50}")
-        logging.info(f"Content:\n{chunk}")
-        logging.info(f"{'='*50}\n")
+    # Log each chunk, only when explicitly asked for: this writes the whole corpus to the log
+    if log_content:
+        for i, chunk in enumerate(chunks, 1):
+            logger.info(f"\n{'='*50}")
+            logger.info(f"CHUNK {i}/{len(chunks)}")
+            logger.info(f"Length: {len(chunk)} characters")
+            logger.info(f"{'='*50}")
+            logger.info(f"Content:\n{chunk}")
+            logger.info(f"{'='*50}\n")
     
     # Save chunks to file for easy viewing
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with atomic_write(output_file) as f:
         f.write(f"Source file: {pdf_path}\n")
         f.write(f"Total chunks: {len(chunks)}\n")
         f.write("="*80 + "\n\n")
@@ -153,29 +162,31 @@ def process_pdf_file(pdf_path, output_file='chunks_output.txt'):
             f.write(chunk)
             f.write("\n" + "="*80 + "\n\n")
     
-    logging.info(f"Saved chunks to file '{output_file}'")
-    logging.info(f"Saved log to file 'chunking.log'")
+    logger.info(f"Saved chunks to file '{output_file}'")
+    logger.info(f"Saved log to file '{LOG_FILE}'")
     
     return chunks
 
 def main():
+    setup_logging(logger, LOG_FILE)
+
     # Read file list
     folder = "corpus"
     files_array = read_files_to_array(folder)
     
     if not files_array:
-        logging.error("No files found in folder")
+        logger.error("No files found in folder")
         return
     
     # Get first file
     first_file = files_array[0]
-    logging.info(f"Processing first file: {first_file}")
+    logger.info(f"Processing first file: {first_file}")
     
     # Process the file
     chunks = process_pdf_file(first_file)
     
     if chunks:
-        logging.info(f"Successfully processed {len(chunks)} chunks")
+        logger.info(f"Successfully processed {len(chunks)} chunks")
 
 if __name__ == "__main__":
     main()
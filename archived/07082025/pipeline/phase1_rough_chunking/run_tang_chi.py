@@ -5,13 +5,21 @@ Script to run chunking on Tang Chi Bo Kinh PDF
 
 import sys
 import os
+import argparse
 
 # Add current directory to path to import agno_chunking
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from agno_chunking import process_pdf_file
+from agno_chunking import process_pdf_file, LOG_FILE, logger as chunking_logger
+from log_utils import setup_logging
 
 def main():
+    parser = argparse.ArgumentParser(description="Phase 1: Rough Chunking of Tang Chi Bo Kinh")
+    parser.add_argument("--log-content", action="store_true", help="Also log the content of every chunk (debug only)")
+    args = parser.parse_args()
+
+    setup_logging(chunking_logger, LOG_FILE)
+
     # Path to the Tang Chi Bo Kinh PDF
     pdf_path = "/Users/ggj/Documents/GitHub/Contextual-Retrieval/corpus/tang-chi-bo-kinh.pdf"
     
@@ -23,7 +31,7 @@ def main():
     print("-" * 60)
     
     # Process the PDF file
-    chunks = process_pdf_file(pdf_path, output_file)
+    chunks = process_pdf_file(pdf_path, output_file, log_content=args.log_content)
     
     if chunks:
         print(f"\n✅ Successfully processed {len(chunks)} chunks")
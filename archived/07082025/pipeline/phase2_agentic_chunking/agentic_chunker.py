@@ -1,28 +1,70 @@
 import os
+import sys
 import json
+import time
 import logging
-from typing import List, Dict, Any
+import hashlib
+import queue
+import threading
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
-import requests
+
+# Thêm thư mục pipeline vào path để dùng các module dùng chung (metrics, file_utils, log_utils, text_utils)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import METRICS
+from file_utils import atomic_write, file_sha256
+from log_utils import setup_logging
+from text_utils import normalize_vietnamese_text
 from config import LM_STUDIO_CONFIG, LOGGING_CONFIG, CHUNKING_CONFIG, get_lm_studio_url, get_api_endpoint
 
-# Setup logging
-logging.basicConfig(
-    level=getattr(logging, LOGGING_CONFIG["level"]),
-    format=LOGGING_CONFIG["format"],
-    handlers=[
-        logging.FileHandler(LOGGING_CONFIG["log_file"]),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+# Tăng khi sửa code tách chunk/parse response làm thay đổi kết quả, để kết quả đã cache không còn được dùng
+CHUNKER_VERSION = "2"
+
 class AgenticChunker:
-    def __init__(self, api_url: str = None):
+    def __init__(self, api_url: str = None, log_content: bool = False):
         self.api_url = api_url or get_lm_studio_url()
+        # Log cả nội dung response từ LM Studio (chỉ dùng khi debug, bật bằng --log-content)
+        self.log_content = log_content
+        # Fingerprint trang đã chunking thành công -> trang gốc {"file", "page"}, dùng chung cho mọi file
+        self.page_index: Dict[str, Dict[str, Any]] = {}
+        # Các trang trùng đã bỏ qua, kèm trang gốc mà chúng tham chiếu tới
+        self.page_refs: List[Dict[str, Any]] = []
+        # Fingerprint của mọi trang (kể cả trang trùng) theo từng file, dùng cho cache theo file
+        self.page_fingerprints: Dict[str, List[str]] = {}
+        # Sau lỗi kết nối, LM Studio bị coi là không khả dụng đến thời điểm này (time.monotonic)
+        self.unavailable_until = 0.0
+        # Các large chunk không được chunking do LM Studio lỗi/không khả dụng, kèm lý do
+        self.skipped_chunks: List[Dict[str, Any]] = []
         
+    def cache_settings(self) -> Dict[str, Any]:
+        """Các thiết lập quyết định kết quả chunking, đưa vào cache key để đổi config/prompt thì chạy lại"""
+        return {
+            "version": CHUNKER_VERSION,
+            "max_chars_per_chunk": CHUNKING_CONFIG["max_chars_per_chunk"],
+            "dedup_pages": CHUNKING_CONFIG["dedup_pages"],
+            "model": LM_STUDIO_CONFIG["model"],
+            "temperature": LM_STUDIO_CONFIG["temperature"],
+            "max_tokens": LM_STUDIO_CONFIG["max_tokens"],
+            "prompt": self.create_chunking_prompt("{text}", 0)
+        }
+    
+    def backend_available(self) -> bool:
+        """LM Studio có đang được coi là khả dụng không"""
+        return time.monotonic() >= self.unavailable_until
+    
     def call_lm_studio(self, prompt: str, model: str = None) -> str:
         """Gọi LM Studio để chunking"""
+        if not self.backend_available():
+            # Không chờ timeout cho từng chunk khi server đang không phản hồi
+            METRICS.inc("llm_skipped_total")
+            return ""
+        
+        # Import ngoài try để thiếu thư viện thì báo lỗi rõ ràng, không bị coi là lỗi của request
+        import requests
+        
         try:
             headers = {
                 "Content-Type": "application/json"
@@ -42,14 +84,28 @@ class AgenticChunker:
             }
             
             endpoint = get_api_endpoint("chat_completions")
-            response = requests.post(endpoint, json=payload, headers=headers, timeout=LM_STUDIO_CONFIG["timeout"])
+            start = time.perf_counter()
+            timeout = (LM_STUDIO_CONFIG["connect_timeout"], LM_STUDIO_CONFIG["timeout"])
+            response = requests.post(endpoint, json=payload, headers=headers, timeout=timeout)
             response.raise_for_status()
+            METRICS.observe("llm_request_seconds", time.perf_counter() - start)
             
             result = response.json()
+            usage = result.get('usage') or {}
+            METRICS.inc("llm_requests_total")
+            METRICS.inc("llm_prompt_tokens_total", usage.get('prompt_tokens', 0))
+            METRICS.inc("llm_completion_tokens_total", usage.get('completion_tokens', 0))
             return result.get('choices', [{}])[0].get('message', {}).get('content', '').strip()
             
         except Exception as e:
+            METRICS.inc("llm_errors_total")
             logger.error(f"Lỗi khi gọi LM Studio: {e}")
+            
+            # Chỉ ngắt khi không kết nối được server; ReadTimeout chỉ là một request chạy lâu
+            if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout)):
+                retry_after = LM_STUDIO_CONFIG["retry_after"]
+                self.unavailable_until = time.monotonic() + retry_after
+                logger.warning(f"LM Studio không phản hồi, bỏ qua các lời gọi trong {retry_after}s tới")
             return ""
     
     def create_chunking_prompt(self, text: str, chunk_index: int) -> str:
@@ -73,7 +129,7 @@ Hãy thực hiện semantic chunking và trả về kết quả theo format:
 """
         return prompt
     
-    def process_text_chunk(self, text: str, chunk_index: int) -> List[Dict[str, Any]]:
+    def process_text_chunk(self, text: str, chunk_index: int, source_file: str = None) -> List[Dict[str, Any]]:
         """Xử lý một chunk text với LM Studio"""
         logger.info(f"Đang xử lý chunk {chunk_index}")
         
@@ -81,14 +137,18 @@ Hãy thực hiện semantic chunking và trả về kết quả theo format:
         response = self.call_lm_studio(prompt)
         
         if not response:
-            logger.warning(f"Không nhận được phản hồi cho chunk {chunk_index}")
+            reason = "lm_studio_error" if self.backend_available() else "lm_studio_unavailable"
+            self.skipped_chunks.append({"file": source_file, "chunk_index": chunk_index, "reason": reason})
+            logger.warning(f"Không nhận được phản hồi cho chunk {chunk_index} ({reason})")
             return []
         
-        # Debug: in ra response
-        logger.info(f"Response từ LM Studio: {response[:500]}...")
+        # Debug: in ra response (chỉ khi bật log nội dung)
+        if self.log_content:
+            logger.info(f"Response từ LM Studio: {response[:500]}...")
         
         # Parse response thành các chunk
         chunks = self.parse_chunking_response(response, chunk_index)
+        METRICS.inc("phase2_semantic_chunks_total", len(chunks))
         logger.info(f"Parse được {len(chunks)} chunks")
         return chunks
     
@@ -130,48 +190,227 @@ Hãy thực hiện semantic chunking và trả về kết quả theo format:
         
         return chunks
     
+    def iter_pdf_pages(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """Đọc lần lượt từng trang PDF (đã chuẩn hóa), không giữ toàn bộ file trong bộ nhớ"""
+        import pdfplumber
+        
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_number, page in enumerate(pdf.pages, 1):
+                page_text = page.extract_text()
+                # Giải phóng cache layout của trang đã đọc xong
+                page.close()
+                METRICS.inc("phase2_pages_total")
+                if page_text:
+                    yield page_number, normalize_vietnamese_text(page_text)
+    
+    def fingerprint_page(self, page_text: str) -> Tuple[str, str]:
+        """
+        Tạo 2 fingerprint cho một trang:
+        - exact: hash của text đã trích xuất
+        - normalized: hash sau khi bỏ khác biệt khoảng trắng và chữ hoa/thường
+        """
+        normalized = " ".join(page_text.casefold().split())
+        exact_hash = hashlib.sha256(page_text.encode('utf-8')).hexdigest()
+        normalized_hash = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        return f"exact:{exact_hash}", f"normalized:{normalized_hash}"
+    
+    def iter_unique_pages(self, pdf_path: str, pending: Dict[str, Dict[str, Any]]) -> Iterator[str]:
+        """
+        Chỉ trả về các trang chưa gặp trước đó, trang trùng được ghi vào page_refs.
+        Fingerprint của các trang mới được đưa vào `pending`, chỉ chuyển sang page_index
+        khi cả file đã được chunking thành công (xem iter_semantic_chunks).
+        """
+        self.page_fingerprints[pdf_path] = []
+        for page_number, page_text in self.iter_pdf_pages(pdf_path):
+            fingerprints = self.fingerprint_page(page_text)
+            self.page_fingerprints[pdf_path].extend(fingerprints)
+            matches = [self.page_index.get(fp) or pending.get(fp) for fp in fingerprints]
+            original = next((m for m in matches if m), None)
+            
+            if original:
+                METRICS.inc("phase2_duplicate_pages_total")
+                match = "exact" if matches[0] else "normalized"
+                self.page_refs.append({
+                    "file": pdf_path,
+                    "page": page_number,
+                    "duplicate_of": original,
+                    "match": match
+                })
+                logger.info(f"Bỏ qua trang {page_number} của {pdf_path}: trùng ({match}) với trang {original['page']} của {original['file']}")
+                continue
+            
+            for fp in fingerprints:
+                pending[fp] = {"file": pdf_path, "page": page_number}
+            yield page_text
+    
+    def page_state(self, pdf_path: str, fingerprints: List[str]) -> str:
+        """
+        Hash của phần page_index mà kết quả của file phụ thuộc vào: trang gốc ở file khác
+        của từng trang trong file (None nếu trang chưa gặp ở file nào trước đó)
+        """
+        state = []
+        for fp in fingerprints:
+            original = self.page_index.get(fp)
+            state.append(original if original and original["file"] != pdf_path else None)
+        payload = json.dumps(state, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def file_cache_path(self, pdf_path: str, cache_dir: Path) -> Path:
+        """File cache kết quả của một file PDF, theo đường dẫn, nội dung file và thiết lập chunking"""
+        payload = json.dumps({"file": pdf_path, "sha256": file_sha256(pdf_path), "settings": self.cache_settings()},
+                             sort_keys=True, ensure_ascii=False)
+        return cache_dir / f"{hashlib.sha256(payload.encode('utf-8')).hexdigest()}.json"
+    
+    def load_cached_file(self, pdf_path: str, cache_file: Path) -> Optional[List[Dict[str, Any]]]:
+        """
+        Lấy kết quả đã cache của file nếu các trang gốc mà nó tham chiếu vẫn như lúc cache,
+        đồng thời đưa các trang của file vào page_index/page_refs như khi chunking lại
+        """
+        if not cache_file.exists():
+            return None
+        
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        
+        if cached["page_state"] != self.page_state(pdf_path, cached["fingerprints"]):
+            return None
+        
+        self.page_index.update(cached["page_index"])
+        self.page_refs.extend(cached["page_refs"])
+        return cached["chunks"]
+    
+    def save_cached_file(self, pdf_path: str, cache_file: Path, chunks: List[Dict[str, Any]],
+                         page_refs_before: int):
+        """Cache kết quả của một file đã chunking đầy đủ"""
+        fingerprints = self.page_fingerprints.get(pdf_path, [])
+        cached = {
+            "fingerprints": fingerprints,
+            "page_state": self.page_state(pdf_path, fingerprints),
+            "page_index": {fp: self.page_index[fp] for fp in fingerprints
+                           if self.page_index.get(fp, {}).get("file") == pdf_path},
+            "page_refs": self.page_refs[page_refs_before:],
+            "chunks": chunks
+        }
+        
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(str(cache_file)) as f:
+            json.dump(cached, f, ensure_ascii=False)
+    
     def read_pdf(self, pdf_path: str) -> str:
         """Đọc file PDF và trả về text"""
         try:
-            import pdfplumber
-            
             text = ""
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+            for _, page_text in self.iter_pdf_pages(pdf_path):
+                text += page_text + "\n"
             
             return text
         except Exception as e:
             logger.error(f"Lỗi đọc PDF {pdf_path}: {str(e)}")
             return ""
     
-    def process_pdf_file(self, pdf_path: str) -> List[Dict[str, Any]]:
-        """Xử lý toàn bộ file PDF"""
-        logger.info(f"Bắt đầu xử lý file: {pdf_path}")
+    def iter_large_chunks(self, pages: Iterable[str], max_chars: int = None) -> Iterator[str]:
+        """Chia luồng trang thành các large chunk, chỉ giữ phần text chưa chia trong bộ nhớ"""
+        if max_chars is None:
+            max_chars = CHUNKING_CONFIG["max_chars_per_chunk"]
         
-        # Đọc PDF
-        text_content = self.read_pdf(pdf_path)
-        if not text_content:
-            logger.error(f"Không thể đọc file: {pdf_path}")
-            return []
+        buffer = ""
+        for page_text in pages:
+            buffer += page_text + "\n"
+            if len(buffer) < 2 * max_chars:
+                continue
+            
+            chunks = self.split_into_large_chunks(buffer, max_chars)
+            # Chunk cuối có thể còn tiếp nối ở trang sau, giữ lại trong buffer
+            yield from chunks[:-1]
+            buffer = chunks[-1] + "\n" if chunks else ""
         
-        # Chia thành các chunk lớn trước (để tránh quá tải)
-        large_chunks = self.split_into_large_chunks(text_content)
+        if buffer.strip():
+            yield from self.split_into_large_chunks(buffer, max_chars)
+    
+    def iter_semantic_chunks(self, pdf_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Pipeline streaming cho một file PDF: đọc trang → chia large chunk → LM Studio.
+        Thread đọc PDF chạy song song với các lời gọi LM Studio, hai stage nối với nhau
+        bằng queue có giới hạn nên thread đọc sẽ dừng chờ khi LM Studio xử lý chậm.
+        """
+        large_chunk_queue = queue.Queue(maxsize=CHUNKING_CONFIG["prefetch_chunks"])
+        stop_event = threading.Event()
+        done = object()
+        duplicates_before = len(self.page_refs)
+        skipped_before = len(self.skipped_chunks)
+        # Fingerprint các trang của file này, chưa được dùng để bỏ qua trang ở file khác
+        pending_pages: Dict[str, Dict[str, Any]] = {}
         
-        all_chunks = []
-        for i, large_chunk in enumerate(large_chunks, 1):
-            logger.info(f"Xử lý large chunk {i}/{len(large_chunks)}")
-            
-                    # Gửi từng large chunk cho LM Studio
-        semantic_chunks = self.process_text_chunk(large_chunk, i)
-        all_chunks.extend(semantic_chunks)
+        def put(item) -> bool:
+            while not stop_event.is_set():
+                try:
+                    large_chunk_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def produce():
+            try:
+                if CHUNKING_CONFIG["dedup_pages"]:
+                    pages = self.iter_unique_pages(pdf_path, pending_pages)
+                else:
+                    pages = (page_text for _, page_text in self.iter_pdf_pages(pdf_path))
+                
+                for large_chunk in self.iter_large_chunks(pages):
+                    if not put(large_chunk):
+                        return
+            except Exception as e:
+                # Chuyển lỗi sang consumer, file đọc dở không được coi là đã xử lý xong
+                put(e)
+            finally:
+                put(done)
+        
+        reader = threading.Thread(target=produce, name="pdf-reader", daemon=True)
+        reader.start()
+        
+        chunk_index = 0
+        try:
+            while True:
+                large_chunk = large_chunk_queue.get()
+                if large_chunk is done:
+                    break
+                if isinstance(large_chunk, Exception):
+                    logger.error(f"Lỗi đọc PDF {pdf_path}: {str(large_chunk)}")
+                    raise large_chunk
+                
+                chunk_index += 1
+                logger.info(f"Xử lý large chunk {chunk_index}")
+                
+                # Gửi từng large chunk cho LM Studio
+                semantic_chunks = self.process_text_chunk(large_chunk, chunk_index, pdf_path)
+                
+                # Log progress
+                logger.info(f"Đã xử lý {len(semantic_chunks)} semantic chunks từ large chunk {chunk_index}")
+                yield from semantic_chunks
+        finally:
+            # Consumer dừng sớm thì báo cho thread đọc thoát thay vì chờ queue mãi
+            stop_event.set()
+            reader.join()
+        
+        if chunk_index == 0 and len(self.page_refs) > duplicates_before:
+            logger.info(f"Mọi trang của {pdf_path} đã được xử lý ở file khác")
+        elif chunk_index == 0:
+            logger.error(f"Không thể đọc file: {pdf_path}")
         
-        # Log progress
-        logger.info(f"Đã xử lý {len(semantic_chunks)} semantic chunks từ large chunk {i}")
+        # Chỉ khi mọi large chunk của file được chunking, các trang của file mới được dùng
+        # làm trang gốc; nếu không, file sau chứa cùng trang sẽ chunking lại thay vì bỏ qua
+        if len(self.skipped_chunks) == skipped_before:
+            self.page_index.update(pending_pages)
+        else:
+            logger.warning(f"{pdf_path} chưa được chunking đầy đủ, không dùng làm trang gốc cho file khác")
+    
+    def process_pdf_file(self, pdf_path: str) -> List[Dict[str, Any]]:
+        """Xử lý toàn bộ file PDF"""
+        logger.info(f"Bắt đầu xử lý file: {pdf_path}")
         
-        return all_chunks
+        with METRICS.timer("phase2_file_seconds"):
+            return list(self.iter_semantic_chunks(pdf_path))
     
     def split_into_large_chunks(self, text: str, max_chars: int = None) -> List[str]:
         """Chia text thành các chunk lớn để gửi cho GPT OSS"""
@@ -218,14 +457,39 @@ Hãy thực hiện semantic chunking và trả về kết quả theo format:
             "chunks": chunks
         }
         
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with atomic_write(output_file) as f:
             json.dump(output_data, f, ensure_ascii=False, indent=2)
         
         logger.info(f"Đã lưu {len(chunks)} chunks vào {output_file}")
     
+    def save_page_refs(self, output_file: str):
+        """Lưu danh sách trang trùng và trang gốc tương ứng ra file JSON"""
+        output_data = {
+            "total_duplicate_pages": len(self.page_refs),
+            "pages": self.page_refs
+        }
+        
+        with atomic_write(output_file) as f:
+            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        
+        logger.info(f"Đã lưu {len(self.page_refs)} trang trùng vào {output_file}")
+    
+    def save_skipped_chunks(self, output_file: str):
+        """Lưu danh sách large chunk bị bỏ qua để chạy lại sau"""
+        output_data = {
+            "total_skipped_chunks": len(self.skipped_chunks),
+            "chunks": self.skipped_chunks
+        }
+        
+        with atomic_write(output_file) as f:
+            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        
+        log = logger.warning if self.skipped_chunks else logger.info
+        log(f"Đã lưu {len(self.skipped_chunks)} large chunk bị bỏ qua vào {output_file}")
+    
     def save_chunks_text(self, chunks: List[Dict[str, Any]], output_file: str):
         """Lưu chunks ra file text để dễ đọc"""
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with atomic_write(output_file) as f:
             f.write(f"Tổng số chunks: {len(chunks)}\n")
             f.write("=" * 80 + "\n\n")
             
@@ -239,48 +503,95 @@ Hãy thực hiện semantic chunking và trả về kết quả theo format:
         
         logger.info(f"Đã lưu chunks text vào {output_file}")
 
-def main():
+def output_paths(pdf_file: Path, corpus_dir: Path, output_dir: Path) -> Tuple[Path, Path]:
+    """
+    Đường dẫn file JSON và file text của một file PDF, giữ cấu trúc thư mục của corpus
+    để hai file trùng tên ở hai bộ kinh khác nhau không ghi đè lên nhau
+    """
+    relative = pdf_file.relative_to(corpus_dir)
+    base = output_dir / relative.parent
+    return base / f"{relative.stem}_agentic_chunks.json", base / f"{relative.stem}_agentic_chunks.txt"
+
+def chunk_corpus(chunker: AgenticChunker, pdf_files: List[Path], output_dir: Path,
+                 corpus_dir: Path, cache_dir: Optional[Path] = None) -> Dict[str, int]:
+    """
+    Chunking lần lượt các file PDF (nằm trong corpus_dir) và lưu kết quả vào output_dir.
+    Có cache_dir thì kết quả từng file được cache, chạy lại chỉ gửi LM Studio các file
+    chưa chunking đầy đủ (hoặc có trang trùng với các file đó)
+    
+    Returns:
+        Dict[str, int]: số chunk tạo được cho mỗi file
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    chunk_counts = {}
+    
+    for pdf_file in pdf_files:
+        logger.info(f"Đang xử lý file: {pdf_file.name}")
+        
+        try:
+            cache_file = chunker.file_cache_path(str(pdf_file), cache_dir) if cache_dir else None
+            chunks = chunker.load_cached_file(str(pdf_file), cache_file) if cache_file else None
+            
+            if chunks is not None:
+                METRICS.inc("phase2_file_cache_hits_total")
+                logger.info(f"Dùng kết quả đã cache cho {pdf_file.name}")
+            else:
+                # Xử lý file
+                page_refs_before = len(chunker.page_refs)
+                skipped_before = len(chunker.skipped_chunks)
+                chunks = chunker.process_pdf_file(str(pdf_file))
+                if cache_file and len(chunker.skipped_chunks) == skipped_before:
+                    chunker.save_cached_file(str(pdf_file), cache_file, chunks, page_refs_before)
+            
+            chunk_counts[str(pdf_file)] = len(chunks)
+            
+            if chunks:
+                # Tạo tên file output
+                json_output, text_output = output_paths(pdf_file, corpus_dir, output_dir)
+                json_output.parent.mkdir(parents=True, exist_ok=True)
+                
+                # Lưu kết quả
+                chunker.save_chunks(chunks, str(json_output))
+                chunker.save_chunks_text(chunks, str(text_output))
+                
+                logger.info(f"Hoàn thành xử lý {pdf_file.name}: {len(chunks)} chunks")
+            else:
+                logger.warning(f"Không tạo được chunks cho {pdf_file.name}")
+                
+        except Exception as e:
+            # Không lưu kết quả dở dang, ghi file vào danh sách chưa xử lý xong
+            chunker.skipped_chunks.append({"file": str(pdf_file), "chunk_index": None, "reason": f"error: {e}"})
+            logger.error(f"Lỗi xử lý {pdf_file.name}: {e}")
+            continue
+    
+    # Trang trùng giữa các file chỉ được chunking một lần, lưu lại tham chiếu về trang gốc.
+    # Luôn ghi file (kể cả rỗng) để không còn sót file cũ của lần chạy trước
+    chunker.save_page_refs(str(output_dir / "duplicate_pages.json"))
+    
+    # Kết quả thiếu phần nào do LM Studio lỗi thì ghi lại, tránh hiểu nhầm là đã đầy đủ
+    chunker.save_skipped_chunks(str(output_dir / "skipped_chunks.json"))
+    
+    return chunk_counts
+
+def main(log_content: bool = False):
     """Hàm chính để chạy agentic chunking"""
-    chunker = AgenticChunker()
+    setup_logging(logger, LOGGING_CONFIG["log_file"], getattr(logging, LOGGING_CONFIG["level"]),
+                  LOGGING_CONFIG["format"])
+    chunker = AgenticChunker(log_content=log_content)
     
     # Thư mục corpus - sử dụng absolute path
     script_dir = Path(__file__).parent
     project_root = script_dir.parent.parent
     corpus_dir = project_root / "corpus"
     
-    # Tạo thư mục output
-    output_dir = Path(CHUNKING_CONFIG["output_dir"])
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Xử lý từng file PDF trong corpus
-    for pdf_dir in corpus_dir.iterdir():
+    # Xử lý từng file PDF trong corpus (sắp xếp để trang gốc của các trang trùng luôn cố định)
+    pdf_files = []
+    for pdf_dir in sorted(corpus_dir.iterdir()):
         if pdf_dir.is_dir():
             logger.info(f"Xử lý thư mục: {pdf_dir.name}")
-            
-            for pdf_file in pdf_dir.glob("*.pdf"):
-                logger.info(f"Đang xử lý file: {pdf_file.name}")
-                
-                try:
-                    # Xử lý file
-                    chunks = chunker.process_pdf_file(str(pdf_file))
-                    
-                    if chunks:
-                        # Tạo tên file output
-                        base_name = pdf_file.stem
-                        json_output = output_dir / f"{base_name}_agentic_chunks.json"
-                        text_output = output_dir / f"{base_name}_agentic_chunks.txt"
-                        
-                        # Lưu kết quả
-                        chunker.save_chunks(chunks, str(json_output))
-                        chunker.save_chunks_text(chunks, str(text_output))
-                        
-                        logger.info(f"Hoàn thành xử lý {pdf_file.name}: {len(chunks)} chunks")
-                    else:
-                        logger.warning(f"Không tạo được chunks cho {pdf_file.name}")
-                        
-                except Exception as e:
-                    logger.error(f"Lỗi xử lý {pdf_file.name}: {e}")
-                    continue
+            pdf_files.extend(sorted(pdf_dir.glob("*.pdf")))
+    
+    chunk_corpus(chunker, pdf_files, Path(CHUNKING_CONFIG["output_dir"]), corpus_dir)
 
 if __name__ == "__main__":
     main()
@@ -1,22 +1,22 @@
 import os
+import sys
 import json
 import random
 import logging
 from typing import List, Dict, Any, Tuple
 from pathlib import Path
+
+# Add pipeline directory to path to import the shared modules (file_utils, log_utils)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_utils import atomic_write
+from log_utils import setup_logging
 from agentic_chunker import AgenticChunker
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('verification.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+LOG_FILE = 'verification.log'
+
 class ChunkQualityVerifier:
     def __init__(self, api_url: str = "http://localhost:1234/v1"):
         self.agentic_chunker = AgenticChunker(api_url)
@@ -247,7 +247,7 @@ Trả về kết quả theo format JSON:
         }
         
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
+            with atomic_write(output_file) as f:
                 json.dump(enhanced_results, f, ensure_ascii=False, indent=2)
             
             logger.info(f"Verification results saved to {output_file}")
@@ -267,7 +267,7 @@ Trả về kết quả theo format JSON:
                 }
             }
             
-            with open(summary_file, 'w', encoding='utf-8') as f:
+            with atomic_write(summary_file) as f:
                 json.dump(summary_data, f, ensure_ascii=False, indent=2)
                 
             logger.info(f"Summary results saved to {summary_file}")
@@ -278,7 +278,7 @@ Trả về kết quả theo format JSON:
     
     def save_verification_report(self, results: Dict[str, Any], output_file: str):
         """Save human-readable verification report"""
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with atomic_write(output_file) as f:
             f.write("CHUNK QUALITY VERIFICATION REPORT\n")
             f.write("=" * 80 + "\n\n")
             
@@ -347,6 +347,7 @@ Trả về kết quả theo format JSON:
 
 def main():
     """Main function to run chunk quality verification"""
+    setup_logging(logger, LOG_FILE)
     verifier = ChunkQualityVerifier()
     
     # Available chunk files
@@ -22,7 +22,9 @@ LM_STUDIO_CONFIG = {
     "host": HOST,
     "port": PORT,
     "base_url": LM_STUDIO_URL,
-    "timeout": 120,
+    "timeout": 120,  # Thời gian chờ tối đa cho một response (giây)
+    "connect_timeout": 5,  # Thời gian chờ kết nối tới server (giây)
+    "retry_after": 60,  # Sau lỗi kết nối, bỏ qua các lời gọi trong khoảng này (giây)
     "model": "openai/gpt-oss-20b",
     "temperature": 0.1,
     "max_tokens": 2000,
@@ -44,6 +46,8 @@ LOGGING_CONFIG = {
 # Chunking Configuration
 CHUNKING_CONFIG = {
     "max_chars_per_chunk": 4000,
+    "prefetch_chunks": 4,  # Số large chunk đọc trước chờ LM Studio (backpressure)
+    "dedup_pages": True,  # Bỏ qua trang trùng nội dung giữa các file PDF trong corpus
     "output_dir": "agentic_chunking/output"
 }
 
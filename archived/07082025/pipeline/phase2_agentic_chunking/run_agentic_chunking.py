@@ -5,35 +5,25 @@ Script to run agentic chunking using the existing agentic_chunker.py
 
 import sys
 import os
-import subprocess
-from pathlib import Path
+import argparse
+
+# Add current directory to path to import agentic_chunker
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 def main():
-    """Run agentic chunking using the existing script"""
+    """Run agentic chunking in this process"""
+    parser = argparse.ArgumentParser(description="Phase 2: Agentic Chunking")
+    parser.add_argument("--log-content", action="store_true", help="Also log LM Studio responses (debug only)")
+    args = parser.parse_args()
+
     print("Starting agentic chunking process...")
     print("-" * 60)
     
     try:
-        # Get the current directory
-        current_dir = Path(__file__).parent
-        
-        # Run the existing agentic_chunker.py
-        print("Running existing agentic_chunker.py...")
-        result = subprocess.run([sys.executable, "agentic_chunker.py"], 
-                              cwd=current_dir, 
-                              capture_output=True, 
-                              text=True, 
-                              encoding='utf-8')
+        from agentic_chunker import main as run_agentic_chunking
         
-        if result.returncode == 0:
-            print("✅ Agentic chunking completed successfully")
-            if result.stdout:
-                print("Output:", result.stdout)
-        else:
-            print("❌ Agentic chunking failed")
-            if result.stderr:
-                print("Error:", result.stderr)
-            return False
+        run_agentic_chunking(log_content=args.log_content)
+        print("✅ Agentic chunking completed successfully")
             
     except Exception as e:
         print(f"❌ Error running agentic chunking: {e}")
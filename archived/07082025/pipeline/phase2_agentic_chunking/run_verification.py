@@ -10,7 +10,8 @@ import sys
 import os
 import json
 from pathlib import Path
-from chunk_quality_verifier import ChunkQualityVerifier
+from chunk_quality_verifier import ChunkQualityVerifier, LOG_FILE, logger as verification_logger
+from log_utils import setup_logging
 
 def load_and_display_json_results(json_file: str):
     """Load and display JSON results in a readable format"""
@@ -77,6 +78,8 @@ def main():
     print("🔍 Chunk Quality Verification")
     print("=" * 50)
     
+    setup_logging(verification_logger, LOG_FILE)
+    
     # Initialize verifier
     verifier = ChunkQualityVerifier()
     
@@ -0,0 +1,17 @@
+"""
+Text helpers shared by the pipeline stages
+"""
+
+import unicodedata
+
+# Look-alike glyphs some PDFs use instead of Vietnamese Đ/đ
+VIETNAMESE_GLYPH_FOLDING = str.maketrans({'\u00d0': '\u0110', '\u00f0': '\u0111'})
+
+def normalize_vietnamese_text(text):
+    """
+    Normalize Vietnamese text extracted from PDF
+    - NFC normalization so precomposed and combining forms compare equal
+    - Fold the look-alike glyphs Ð/ð (U+00D0/U+00F0) into Đ/đ (U+0110/U+0111)
+    """
+    text = unicodedata.normalize('NFC', text)
+    return text.translate(VIETNAMESE_GLYPH_FOLDING)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the pipeline modules
+
+Imports each module in a fresh interpreter with `python -X importtime`
+and reports the total import time plus the slowest imports.
+"""
+
+import os
+import sys
+import subprocess
+import tempfile
+from pathlib import Path
+
+# Module name -> directory that must be on sys.path to import it
+MODULES = {
+    "agno_chunking": "pipeline/phase1_rough_chunking",
+    "agentic_chunker": "pipeline/phase2_agentic_chunking",
+    "chunk_quality_verifier": "pipeline/phase2_agentic_chunking",
+}
+
+def measure_import(module_name, module_dir):
+    """
+    Import a module with -X importtime in a fresh interpreter
+
+    Returns:
+        list: (cumulative_us, imported_name) tuples, one per top-level import
+    """
+    env = dict(os.environ, PYTHONPATH=str(module_dir))
+
+    # Run from a temp directory so the modules' log files do not land in the project
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+                              cwd=work_dir, env=env, capture_output=True, text=True, encoding='utf-8')
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only top-level entries, nested imports are already counted in their parent
+        if name.startswith("  "):
+            continue
+        imports.append((int(cumulative), name.strip()))
+
+    return imports
+
+def main():
+    """Run the startup benchmark for every pipeline module"""
+    print("⏱️  Pipeline Startup Benchmark")
+    print("=" * 60)
+
+    project_root = Path(__file__).parent.parent
+    failed = False
+
+    for module_name, module_dir in MODULES.items():
+        try:
+            imports = measure_import(module_name, project_root / module_dir)
+        except Exception as e:
+            print(f"❌ {module_name}: {e}")
+            failed = True
+            continue
+
+        total_ms = sum(cumulative for cumulative, _ in imports) / 1000
+        print(f"\n📦 {module_name}: {total_ms:.1f} ms")
+
+        for cumulative, name in sorted(imports, reverse=True)[:5]:
+            print(f"   {cumulative / 1000:8.1f} ms  {name}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,60 +5,190 @@ Main script to run the complete chunking pipeline
 
 import os
 import sys
-import subprocess
+import logging
+import argparse
 from pathlib import Path
+from functools import partial
 
-def run_phase(phase_name, script_path):
-    """Run a specific phase of the pipeline"""
-    print(f"\n🚀 Running {phase_name}...")
-    print("=" * 60)
-    
+# Get the project root directory
+PROJECT_ROOT = Path(__file__).parent.parent
+PHASE1_DIR = PROJECT_ROOT / "pipeline" / "phase1_rough_chunking"
+PHASE2_DIR = PROJECT_ROOT / "pipeline" / "phase2_agentic_chunking"
+
+# Make the pipeline modules importable in this process
+for path in (PROJECT_ROOT / "pipeline", PHASE1_DIR, PHASE2_DIR):
+    sys.path.append(str(path))
+
+from dag_runner import Stage, PipelineRunner
+from metrics import METRICS
+from file_utils import file_sha256
+
+CORPUS_DIR = PROJECT_ROOT / "corpus"
+RESULTS_DIR = PROJECT_ROOT / "results"
+CACHE_DIR = RESULTS_DIR / ".cache"
+
+def list_corpus_files():
+    """Stage: every PDF in the corpus with its content hash"""
+    return [{"path": str(pdf_file), "sha256": file_sha256(pdf_file)}
+            for pdf_file in sorted(CORPUS_DIR.rglob("*.pdf"))]
+
+def rough_chunk_file(corpus_files, log_content=False):
+    """Stage (per file): Phase 1 text extraction and story segmentation"""
+    from agno_chunking import process_pdf_file
+
+    pdf_path = Path(corpus_files["path"])
+    # Keep the corpus folders, files with the same name in two collections must not share an output
+    relative = pdf_path.relative_to(CORPUS_DIR)
+    output_file = RESULTS_DIR / "phase1" / relative.parent / f"{relative.stem}_rough_chunks.txt"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    chunks = process_pdf_file(str(pdf_path), str(output_file), log_content=log_content)
+    # Do not cache a failed extraction, process_pdf_file returns [] on any error
+    if not chunks:
+        raise RuntimeError(f"Phase 1 produced no chunks for {pdf_path.name}, check the log for the cause")
+
+    return {"source_file": str(pdf_path), "output_file": str(output_file), "total_chunks": len(chunks)}
+
+def agentic_chunk_corpus(corpus_files, log_content=False, file_cache_dir=None):
+    """Stage: Phase 2 agentic chunking over the whole corpus, file_cache_dir caches each file's result"""
+    from agentic_chunker import AgenticChunker, chunk_corpus
+
+    # Files are processed in order in one chunker so duplicate pages are chunked once
+    chunker = AgenticChunker(log_content=log_content)
+    chunk_counts = chunk_corpus(chunker, [Path(f["path"]) for f in corpus_files],
+                                RESULTS_DIR / "phase2", CORPUS_DIR, file_cache_dir)
+    # Do not cache an incomplete result, it usually means LM Studio was unreachable
+    if not any(chunk_counts.values()):
+        raise RuntimeError("Phase 2 produced no chunks, check the LM Studio connection")
+    if chunker.skipped_chunks:
+        raise RuntimeError(f"Phase 2 skipped {len(chunker.skipped_chunks)} chunks, "
+                           f"see results/phase2/skipped_chunks.json")
+
+    return chunk_counts
+
+def agentic_output_files(chunk_counts):
+    """Files written by chunk_corpus for the given chunk counts"""
+    from agentic_chunker import output_paths
+
+    files = []
+    for pdf_path, count in chunk_counts.items():
+        if count:
+            files.extend(str(path) for path in output_paths(Path(pdf_path), CORPUS_DIR, RESULTS_DIR / "phase2"))
+    return files
+
+def agentic_cache_settings():
+    """Phase 2 config and prompt, part of the agentic_chunks cache key"""
+    from agentic_chunker import AgenticChunker
+
+    return AgenticChunker().cache_settings()
+
+def verify_rough_chunks(rough_chunks):
+    """Stage (per file): quality verification of the Phase 1 chunks"""
+    from chunk_quality_verifier import ChunkQualityVerifier
+
+    verifier = ChunkQualityVerifier()
+    results = verifier.run_verification(rough_chunks["output_file"], num_chunks=5)
+    if not results:
+        return {}
+
+    results_file = rough_chunks["output_file"].replace("_rough_chunks.txt", "_verification.json")
+    verifier.save_verification_results(results, results_file)
+    return results.get("summary", {})
+
+def build_stages(log_content=False, use_cache=True):
+    """Declare the pipeline DAG, log_content turns on content logging in both phases"""
+    # Phase 2 also caches per file, so after a failure only the files that failed are sent to LM Studio again
+    file_cache_dir = CACHE_DIR / "agentic_chunks_files" if use_cache else None
+
+    return [
+        Stage("corpus_files", list_corpus_files, output_type=list, cache=False),
+        Stage("rough_chunks", partial(rough_chunk_file, log_content=log_content), inputs=["corpus_files"],
+              output_type=dict, fan_out="corpus_files", version="3",
+              output_files=lambda output: [output["output_file"]],
+              # pdfminer extraction is pure Python and holds the GIL, threads would not run it in parallel
+              executor="process"),
+        Stage("agentic_chunks", partial(agentic_chunk_corpus, log_content=log_content, file_cache_dir=file_cache_dir), inputs=["corpus_files"],
+              output_type=dict, version="3", key_extras=agentic_cache_settings,
+              output_files=agentic_output_files),
+        Stage("verification", verify_rough_chunks, inputs=["rough_chunks"],
+              output_type=dict, fan_out="rough_chunks", cache=False),
+    ]
+
+def configure_logging():
+    """Configure logging once for every phase running in this process"""
+    from config import LOGGING_CONFIG
+    from log_utils import setup_logging
+    import agno_chunking
+    import agentic_chunker
+    import chunk_quality_verifier
+
+    # Each phase keeps its own log file, the level and format come from the phase 2 config
+    level = getattr(logging, LOGGING_CONFIG["level"])
+    for logger, log_file in ((agno_chunking.logger, agno_chunking.LOG_FILE),
+                             (agentic_chunker.logger, LOGGING_CONFIG["log_file"]),
+                             (chunk_quality_verifier.logger, chunk_quality_verifier.LOG_FILE)):
+        setup_logging(logger, log_file, level, LOGGING_CONFIG["format"])
+
+def save_metrics():
+    """Export the metrics of this run as JSON and as a Prometheus text file"""
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    METRICS.save_json(str(RESULTS_DIR / "metrics.json"))
+    METRICS.save_prometheus(str(RESULTS_DIR / "metrics.prom"))
+    print(f"📈 Metrics saved to: {RESULTS_DIR / 'metrics.json'} and {RESULTS_DIR / 'metrics.prom'}")
+
+def run(targets, use_cache=True, workers=4, profile_dir=None, log_content=False):
+    """Run the given stages (and their dependencies) in this process"""
+    if profile_dir:
+        METRICS.profile_dir = Path(profile_dir)
+        # cProfile supports one active profiler at a time, run stages one by one
+        workers = 1
+
+    runner = PipelineRunner(build_stages(log_content, use_cache), cache_dir=str(CACHE_DIR) if use_cache else None,
+                            max_workers=workers, process_initializer=configure_logging)
     try:
-        # Run the script from project root
-        result = subprocess.run([sys.executable, script_path], 
-                              capture_output=True, text=True, encoding='utf-8')
-        
-        if result.returncode == 0:
-            print(f"✅ {phase_name} completed successfully")
-            if result.stdout:
-                print("Output:", result.stdout)
-        else:
-            print(f"❌ {phase_name} failed")
-            if result.stderr:
-                print("Error:", result.stderr)
-            return False
-            
+        runner.run(targets)
     except Exception as e:
-        print(f"❌ Error running {phase_name}: {e}")
+        print(f"\n❌ {e}")
+        if e.__cause__:
+            print(f"   Cause: {e.__cause__}")
         return False
-    
+    finally:
+        save_metrics()
+
     return True
 
 def main():
     """Run the complete pipeline"""
+    parser = argparse.ArgumentParser(description="Contextual Retrieval - Chunking Pipeline")
+    parser.add_argument("--verify", action="store_true", help="Also run chunk quality verification")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached stage outputs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4,
+                        help="Maximum number of stages / files processed in parallel")
+    parser.add_argument("--profile-dir", help="Write a cProfile dump per stage call to this directory")
+    parser.add_argument("--log-content", action="store_true",
+                        help="Also log chunk contents and LM Studio responses in both phases (debug only)")
+    args = parser.parse_args()
+
     print("🎯 Contextual Retrieval - Chunking Pipeline")
     print("=" * 60)
-    
-    # Get the project root directory
-    project_root = Path(__file__).parent.parent
-    os.chdir(project_root)
-    
-    # Phase 1: Rough Chunking
-    phase1_script = "pipeline/phase1_rough_chunking/run_tang_chi.py"
-    if not run_phase("Phase 1: Rough Chunking", phase1_script):
-        print("\n❌ Pipeline failed at Phase 1")
-        return
-    
-    # Phase 2: Agentic Chunking
-    phase2_script = "pipeline/phase2_agentic_chunking/run_agentic_chunking.py"
-    if not run_phase("Phase 2: Agentic Chunking", phase2_script):
-        print("\n❌ Pipeline failed at Phase 2")
+
+    # Relative paths in the phase configs (log files, output_dir) are relative to the project root
+    os.chdir(PROJECT_ROOT)
+    configure_logging()
+
+    targets = ["rough_chunks", "agentic_chunks"]
+    if args.verify:
+        targets.append("verification")
+
+    if not run(targets, use_cache=not args.no_cache, workers=args.workers, profile_dir=args.profile_dir,
+               log_content=args.log_content):
+        print("\n❌ Pipeline failed")
         return
-    
+
     print("\n🎉 Pipeline completed successfully!")
     print("\n📁 Results available in:")
-    print("   - results/phase1_rough_chunks.txt")
-    print("   - results/phase2_agentic_chunks.txt")
+    print("   - results/phase1/")
+    print("   - results/phase2/")
 
 if __name__ == "__main__":
     main()